@@ -2,15 +2,24 @@ import streamlit as st
 import subprocess
 import json
 import os
+import sys
+import shutil
 import re
 import requests
-import platform
-import copy
+import atexit
+import hashlib
+import tempfile
+import time
+import threading
+import queue
+import orjson
 import pandas as pd
-from openai import OpenAI
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, urljoin
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from pathlib import Path
 
 # --- Configuration & Initialization ---
 st.set_page_config(
@@ -19,55 +28,334 @@ st.set_page_config(
     layout="wide",
 )
 
-# Initialize OpenAI client
-try:
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-    OPENAI_ENABLED = True
-except Exception:
-    OPENAI_ENABLED = False
+# The OpenAI client (and the openai import) is created on first use; see get_openai_client
+OPENAI_ENABLED = bool(os.environ.get("OPENAI_API_KEY"))
+if not OPENAI_ENABLED:
     st.sidebar.warning("OpenAI API key not found. AI Recommendations will be disabled.", icon="⚠️")
 
+# Raw Lighthouse reports are cached on disk so re-audits survive Streamlit restarts.
+TEMP_DIR = Path(os.environ.get("WEBAUDIT_TEMP_DIR", Path(tempfile.gettempdir()) / "webaudit"))
+TEMP_DIR.mkdir(parents=True, exist_ok=True)
+LIGHTHOUSE_CACHE_TTL = int(os.environ.get("LIGHTHOUSE_CACHE_TTL", 3600))
+
+# Number of Playwright browsers kept for fetching pages, i.e. how many audits can load
+# their page at the same time.
+BROWSER_POOL_SIZE = max(1, int(os.environ.get("BROWSER_POOL_SIZE", 2)))
+
+# Node server that runs the Lighthouse audits (see package.json for its dependencies).
+LIGHTHOUSE_SERVER = Path(__file__).with_name("lighthouse_server.mjs")
+# Seconds a Lighthouse run may take once it starts, and may wait queued behind other
+# audits before that.
+LIGHTHOUSE_RUN_TIMEOUT = 120
+LIGHTHOUSE_QUEUE_TIMEOUT = int(os.environ.get("LIGHTHOUSE_QUEUE_TIMEOUT", 300))
+
+# Precompiled patterns used by analyze_technical
+LINK_RE = re.compile(r'<a\b[^>]*href=["\']([^"\']+)["\']', re.I)
+CONTACT_RE = re.compile(r'contact', re.I)
+PRIVACY_RE = re.compile(r'privacy', re.I)
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_RE = re.compile(r'(\+\d{1,3}[-.\s]?)?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}')
+
+# --- Runtime Dependencies ---
+# The Docker image installs these at build time; on other hosts (or a fresh volume)
+# they are installed on first start. Each check only probes for what the app will
+# actually run, and the two installs are independent so a partial setup only
+# installs what is missing.
+
+# A failed install is retried at most this often (in seconds), not on every rerun.
+DEPENDENCY_RETRY_INTERVAL = int(os.environ.get("DEPENDENCY_RETRY_INTERVAL", 600))
+
+def _install_lighthouse(npm):
+    subprocess.run([npm, "install", "--omit=dev"], cwd=LIGHTHOUSE_SERVER.parent, check=True, capture_output=True, timeout=600)
+
+def _install_playwright_chromium():
+    subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True, capture_output=True, timeout=600)
+
+# Prints the Chromium executable the installed Playwright expects. Run in a subprocess
+# so playwright is not imported into the app process at startup.
+_PLAYWRIGHT_EXECUTABLE_PROBE = (
+    "from playwright.sync_api import sync_playwright\n"
+    "with sync_playwright() as p:\n"
+    "    print(p.chromium.executable_path)\n"
+)
+
+def _playwright_chromium_installed():
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", _PLAYWRIGHT_EXECUTABLE_PROBE],
+            check=True, capture_output=True, text=True, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    executable = result.stdout.strip()
+    return bool(executable) and Path(executable).exists()
+
+def _ensure_lighthouse():
+    """Installs Lighthouse if missing. Returns (problem, permanent); problem is None when ready."""
+    if shutil.which("node") is None:
+        # Installing Node is outside the app's reach; don't look again until restart.
+        return "Node.js not found. Lighthouse audits will fail.", True
+    if (LIGHTHOUSE_SERVER.parent / "node_modules" / "lighthouse").exists():
+        return None, False
+    # Resolved rather than run by name: on Windows the executable is npm.cmd.
+    npm = shutil.which("npm")
+    if npm is None:
+        return "npm not found, so Lighthouse cannot be installed. Lighthouse audits will fail.", True
+    try:
+        _install_lighthouse(npm)
+    except (OSError, subprocess.SubprocessError) as e:
+        return f"Could not install Lighthouse: {e}", False
+    return None, False
+
+def _ensure_playwright_chromium():
+    """Installs Playwright's Chromium if missing. Returns (problem, permanent); problem is None when ready."""
+    if _playwright_chromium_installed():
+        return None, False
+    try:
+        _install_playwright_chromium()
+    except (OSError, subprocess.SubprocessError) as e:
+        return f"Could not install the Playwright browser: {e}", False
+    return None, False
+
+class AuditDependencies:
+    """Process-wide setup state for Lighthouse and Playwright's Chromium.
+
+    Each dependency is checked once. One that failed to install is retried on a later
+    run once DEPENDENCY_RETRY_INTERVAL has passed; permanent problems are not retried.
+    """
+
+    CHECKS = {"lighthouse": _ensure_lighthouse, "playwright": _ensure_playwright_chromium}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._problems = {}
+        self._last_attempt = {}
+        self._done = set()
+
+    def check(self):
+        """Runs the checks that are due and returns the current list of problems."""
+        # Another session already running an install shouldn't block this rerun.
+        if self._lock.acquire(blocking=False):
+            try:
+                for name, ensure in self.CHECKS.items():
+                    last_attempt = self._last_attempt.get(name)
+                    if name in self._done or (last_attempt is not None and time.monotonic() - last_attempt < DEPENDENCY_RETRY_INTERVAL):
+                        continue
+                    self._last_attempt[name] = time.monotonic()
+                    problem, permanent = ensure()
+                    if problem is None:
+                        self._problems.pop(name, None)
+                        self._done.add(name)
+                    else:
+                        self._problems[name] = problem
+                        if permanent:
+                            self._done.add(name)
+            finally:
+                self._lock.release()
+        return list(self._problems.values())
+
+@st.cache_resource(show_spinner=False)
+def get_audit_dependencies():
+    """Returns the process-wide AuditDependencies."""
+    return AuditDependencies()
+
+with st.spinner("Checking audit dependencies..."):
+    dependency_problems = get_audit_dependencies().check()
+for problem in dependency_problems:
+    st.sidebar.warning(problem, icon="⚠️")
+
 # --- Core Audit Functions ---
 
-def run_single_lighthouse_audit(url, device='desktop'):
-    """Runs a single Lighthouse audit for a specific device."""
-    st.write(f"🏃‍♂️ Running Lighthouse audit for **{device.capitalize()}**...")
-
-    command = [
-        "lighthouse",
-        url,
-        "--output=json",
-        "--output-path=stdout",
-        "--only-categories=performance,seo,accessibility,best-practices",
-        "--chrome-flags=--headless --no-sandbox --disable-dev-shm-usage",
-    ]
+class LighthouseRun:
+    """An audit submitted to a LighthouseServer.
 
-    # The default lighthouse run is mobile. We only need to add a flag for desktop.
-    if device == 'desktop':
-        command.append("--preset=desktop")
+    `started` is set when the run leaves the server's queue, and `future` resolves when
+    it finishes.
+    """
 
-    use_shell = platform.system() == "Windows"
-    
+    def __init__(self):
+        self.future = Future()
+        self.started = threading.Event()
+        self.started_at = None
+        self.queue_deadline = time.monotonic() + LIGHTHOUSE_QUEUE_TIMEOUT + 5
+
+    def mark_started(self):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.started.set()
+
+    def wait(self):
+        """Waits for the run to start and then to finish; raises FuturesTimeoutError if either takes too long."""
+        if not self.started.wait(timeout=max(0, self.queue_deadline - time.monotonic())):
+            raise FuturesTimeoutError()
+        self.future.result(timeout=max(0, self.started_at + LIGHTHOUSE_RUN_TIMEOUT - time.monotonic()))
+
+class LighthouseServer:
+    """Client for lighthouse_server.mjs, a long-lived Node process that runs Lighthouse audits.
+
+    Keeping the process alive avoids paying Node startup and Lighthouse's module loading
+    on every audit, and lets the server reuse a warm Chrome. Requests carry an id, so
+    audits from any session can be submitted at once; the server runs them one at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process = None
+        self._pending = {}
+        self._next_id = 0
+
+    def _ensure_started(self):
+        # Called with self._lock held. Restarts the server if it has exited.
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["node", str(LIGHTHOUSE_SERVER)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1
+            )
+            threading.Thread(target=self._read_responses, args=(self._process,), daemon=True).start()
+        return self._process
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            with self._lock:
+                if message.get("started"):
+                    run, _ = self._pending.get(message.get("id"), (None, None))
+                else:
+                    run, _ = self._pending.pop(message.get("id"), (None, None))
+            if run is None:
+                continue
+            # A run that fails before starting also wakes whoever waits for it to start
+            run.mark_started()
+            if message.get("started"):
+                continue
+            if message.get("error"):
+                run.future.set_exception(RuntimeError(message["error"]))
+            else:
+                run.future.set_result(None)
+
+        # The server exited; fail whatever it was still working on.
+        with self._lock:
+            orphaned = [request_id for request_id, (_, owner) in self._pending.items() if owner is process]
+            runs = [self._pending.pop(request_id)[0] for request_id in orphaned]
+        for run in runs:
+            run.mark_started()
+            run.future.set_exception(RuntimeError(f"Lighthouse server exited with code {process.wait()}"))
+
+    def submit(self, url, device, output_path):
+        """Queues an audit whose JSON report is written to output_path. Returns a LighthouseRun."""
+        run = LighthouseRun()
+        with self._lock:
+            process = self._ensure_started()
+            self._next_id += 1
+            request_id = self._next_id
+            self._pending[request_id] = (run, process)
+            command = {
+                "id": request_id, "url": url, "device": device, "outputPath": str(output_path),
+                "queueTimeoutMs": LIGHTHOUSE_QUEUE_TIMEOUT * 1000
+            }
+            try:
+                process.stdin.write(json.dumps(command) + "\n")
+                process.stdin.flush()
+            except OSError as e:
+                del self._pending[request_id]
+                run.mark_started()
+                run.future.set_exception(RuntimeError(f"Could not reach the Lighthouse server: {e}"))
+        return run
+
+    def close(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+@st.cache_resource(show_spinner=False)
+def get_lighthouse_servers():
+    """Returns the process-wide Lighthouse server clients, one per device; each Node process starts on first use."""
+    servers = {device: LighthouseServer() for device in ('desktop', 'mobile')}
+    for server in servers.values():
+        atexit.register(server.close)
+    return servers
+
+def lighthouse_cache_path(url, device):
+    """Returns the on-disk cache location for a URL/device Lighthouse report."""
+    key = hashlib.sha256(f"{url}|{device}".encode()).hexdigest()
+    return TEMP_DIR / f"{key}.json"
+
+def new_lighthouse_output_path():
+    """Returns a fresh file in TEMP_DIR for Lighthouse to write a report into."""
+    fd, path = tempfile.mkstemp(suffix=".json", dir=TEMP_DIR)
+    os.close(fd)
+    return Path(path)
+
+def load_cached_lighthouse_output(cache_path):
+    """Returns the cached raw report if it is younger than LIGHTHOUSE_CACHE_TTL, else None."""
     try:
-        result = subprocess.run(
-            command, 
-            capture_output=True, 
-            text=True, 
-            check=True, 
-            shell=use_shell,
-            timeout=120  # Add a 2-minute timeout
-        )
-    except subprocess.TimeoutExpired:
-        st.error(f"Lighthouse audit for {device} timed out after 2 minutes.")
-        return {"error": "Timeout"}
-    except subprocess.CalledProcessError as e:
-        st.error(f"Lighthouse audit for {device} failed.")
-        st.code(f"Error details from Lighthouse:\n{e.stderr}", language="bash")
-        return {"error": str(e), "stderr": e.stderr}
+        if time.time() - cache_path.stat().st_mtime < LIGHTHOUSE_CACHE_TTL:
+            return cache_path.read_bytes()
+    except OSError:
+        pass
+    return None
+
+def prune_lighthouse_cache():
+    """Deletes reports in TEMP_DIR older than LIGHTHOUSE_CACHE_TTL so the cache doesn't grow without bound."""
+    # In-flight output files live in TEMP_DIR too; never touch anything younger than
+    # a few minutes, even with a very short TTL.
+    cutoff = time.time() - max(LIGHTHOUSE_CACHE_TTL, 300)
+    for path in TEMP_DIR.glob("*.json"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
 
+def collect_lighthouse_result(run, device, output_path, cache_path):
+    """Waits for a Lighthouse run, moves its report into the disk cache and returns the summary data."""
     try:
-        report = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
+        try:
+            run.wait()
+            output = output_path.read_bytes()
+        except FuturesTimeoutError:
+            # The server may still write the report after we give up; remove it once it replies.
+            run.future.add_done_callback(lambda _: output_path.unlink(missing_ok=True))
+            if run.started.is_set():
+                st.error(f"Lighthouse audit for {device} timed out after 2 minutes.")
+            else:
+                st.error(f"Lighthouse audit for {device} is still queued behind other audits. Please try again shortly.")
+            return {"error": "Timeout"}
+        except RuntimeError as e:
+            st.error(f"Lighthouse audit for {device} failed.")
+            st.code(f"Error details from Lighthouse:\n{e}", language="bash")
+            return {"error": str(e)}
+        except OSError as e:
+            st.error(f"Could not read the Lighthouse report for {device}.")
+            return {"error": str(e)}
+
+        summary = parse_lighthouse_output(output, device, cache_path)
+        if not summary.get("error"):
+            try:
+                os.replace(output_path, cache_path)
+            except OSError:
+                pass
+        return summary
+    finally:
+        output_path.unlink(missing_ok=True)
+
+def parse_lighthouse_output(output, device, cache_path):
+    """Extracts the summary data from a raw Lighthouse JSON report for a specific device."""
+    try:
+        report = orjson.loads(output)
+    except orjson.JSONDecodeError as e:
         st.error(f"Failed to parse Lighthouse JSON output for {device}")
         return {"error": f"JSON parsing error: {str(e)}"}
     
@@ -93,28 +381,78 @@ def run_single_lighthouse_audit(url, device='desktop'):
             'Cumulative Layout Shift': get_metric('cumulative-layout-shift'),
             'Speed Index': get_metric('speed-index'),
         },
-        "full_report": report
+        # The raw report stays on disk; keeping it out of the returned data keeps
+        # st.cache_data entries small. It is loaded on demand in the UI.
+        "full_report": {"_path": str(cache_path)}
     }
 
 def run_lighthouse_audits(url):
-    """Runs both desktop and mobile Lighthouse audits."""
+    """Runs the desktop and mobile Lighthouse audits concurrently."""
     results = {}
+    devices = ('desktop', 'mobile')
+    output_paths = {}
+    runs = {}
     try:
-        results['desktop'] = run_single_lighthouse_audit(url, 'desktop')
-        results['mobile'] = run_single_lighthouse_audit(url, 'mobile')
+        # A server process runs one audit at a time (Lighthouse's global state isn't safe
+        # to share between runs), so each device has its own server and the two run side
+        # by side. This can skew scores slightly under CPU contention; give the container
+        # at least 2 vCPUs if that matters.
+        cache_paths = {device: lighthouse_cache_path(url, device) for device in devices}
+        cached = {}
+        for device in devices:
+            output = load_cached_lighthouse_output(cache_paths[device])
+            if output is not None:
+                st.write(f"♻️ Using cached Lighthouse report for **{device.capitalize()}**.")
+                cached[device] = output
+
+        pending = [device for device in devices if device not in cached]
+        output_paths = {device: new_lighthouse_output_path() for device in pending}
+        if pending:
+            prune_lighthouse_cache()
+            st.write(f"🏃‍♂️ Running Lighthouse audits for **{' & '.join(d.capitalize() for d in pending)}**...")
+            servers = get_lighthouse_servers()
+            runs = {device: servers[device].submit(url, device, output_paths[device]) for device in pending}
+
+        for device in devices:
+            if device in cached:
+                results[device] = parse_lighthouse_output(cached[device], device, cache_paths[device])
+            else:
+                results[device] = collect_lighthouse_result(runs[device], device, output_paths[device], cache_paths[device])
     except Exception as e:
+        # Don't leave report files behind, including ones a queued run writes later
+        for device, output_path in output_paths.items():
+            output_path.unlink(missing_ok=True)
+            if device in runs:
+                runs[device].future.add_done_callback(lambda _, path=output_path: path.unlink(missing_ok=True))
         st.error(f"A critical error occurred during Lighthouse audits: {e}")
         return {"error": str(e)}
     return results
 
+# Only the tags read by analyze_seo are built into the tree;
+# scripts, styles and SVGs are skipped during parsing.
+AUDITED_TAGS = SoupStrainer(['title', 'meta', 'img', 'h1', 'h2', 'h3', 'h4'])
+
+def parse_html(page_content):
+    """Parses HTML with the lxml parser, falling back to the pure-Python parser if lxml is unavailable."""
+    try:
+        return BeautifulSoup(page_content, 'lxml', parse_only=AUDITED_TAGS)
+    except FeatureNotFound:
+        return BeautifulSoup(page_content, 'html.parser', parse_only=AUDITED_TAGS)
+
 def analyze_seo(soup):
     """Analyzes on-page SEO factors and returns structured data."""
     st.write("🔎 Analyzing SEO factors...")
     
     title = soup.find('title')
     desc = soup.find('meta', attrs={'name': 'description'})
-    images = soup.find_all('img')
-    images_without_alt = [img for img in images if not img.get('alt', '').strip()]
+    # A single tree walk collects both the images and the heading counts
+    tag_counts = Counter()
+    missing_alt = 0
+    for tag in soup.find_all(['img', 'h1', 'h2', 'h3', 'h4']):
+        tag_counts[tag.name] += 1
+        if tag.name == 'img' and not tag.get('alt', '').strip():
+            missing_alt += 1
+    total_images = tag_counts['img']
     
     return {
         "title": {
@@ -126,41 +464,76 @@ def analyze_seo(soup):
             "text": desc.get('content', '').strip() if desc else "Not Found",
             "length": len(desc.get('content', '').strip()) if desc else 0
         },
-        "headings": {
-            "h1": len(soup.find_all('h1')),
-            "h2": len(soup.find_all('h2')),
-            "h3": len(soup.find_all('h3')),
-            "h4": len(soup.find_all('h4')),
-        },
+        "headings": {level: tag_counts[level] for level in ('h1', 'h2', 'h3', 'h4')},
         "images": {
-            "total": len(images),
-            "missing_alt": len(images_without_alt),
-            "coverage_percent": f"{(len(images) - len(images_without_alt)) / len(images) * 100:.1f}" if images else "100.0"
+            "total": total_images,
+            "missing_alt": missing_alt,
+            "coverage_percent": f"{(total_images - missing_alt) / total_images * 100:.1f}" if total_images else "100.0"
         }
     }
 
-def analyze_technical(soup, url, page_content):
-    """Analyzes technical website features."""
-    st.write("⚙️ Analyzing technical features...")
-    
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """Returns a shared requests session so connections and TLS sessions are reused across audits."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def check_robots_txt(url):
+    """Returns whether the site serves a robots.txt. Safe to call from a worker thread."""
     try:
-        robots_response = requests.get(urljoin(url, '/robots.txt'), timeout=5)
-        robots_ok = robots_response.status_code == 200
+        robots_response = get_http_session().get(urljoin(url, '/robots.txt'), timeout=5)
+        return robots_response.status_code == 200
     except requests.RequestException:
-        robots_ok = False
+        return False
 
-    # Fixed regex for phone number detection
-    phone_pattern = r'(\+\d{1,3}[-.\s]?)?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}'
+def analyze_technical(url, page_content, robots_future):
+    """Analyzes technical website features."""
+    st.write("⚙️ Analyzing technical features...")
+    
+    robots_ok = robots_future.result()
+
+    # One pass over the raw HTML instead of repeated BeautifulSoup tree searches
+    has_contact = has_privacy = False
+    for match in LINK_RE.finditer(page_content):
+        href = match.group(1)
+        has_contact = has_contact or bool(CONTACT_RE.search(href))
+        has_privacy = has_privacy or bool(PRIVACY_RE.search(href))
+        if has_contact and has_privacy:
+            break
+    
+    https_enabled = url.startswith('https://')
+    has_email = bool(EMAIL_RE.search(page_content))
+    has_phone = bool(PHONE_RE.search(page_content))
     
     return {
-        "https_enabled": {"value": url.startswith('https://'), "status": "✅" if url.startswith('https://') else "❌"},
-        "has_contact_page": {"value": bool(soup.find('a', href=re.compile(r'contact', re.I))), "status": "✅" if bool(soup.find('a', href=re.compile(r'contact', re.I))) else "⚠️"},
-        "has_email": {"value": bool(re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', page_content)), "status": "✅" if bool(re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', page_content)) else "⚠️"},
-        "has_phone": {"value": bool(re.search(phone_pattern, page_content)), "status": "✅" if bool(re.search(phone_pattern, page_content)) else "⚠️"},
-        "has_privacy_link": {"value": bool(soup.find('a', href=re.compile(r'privacy', re.I))), "status": "✅" if bool(soup.find('a', href=re.compile(r'privacy', re.I))) else "❌"},
+        "https_enabled": {"value": https_enabled, "status": "✅" if https_enabled else "❌"},
+        "has_contact_page": {"value": has_contact, "status": "✅" if has_contact else "⚠️"},
+        "has_email": {"value": has_email, "status": "✅" if has_email else "⚠️"},
+        "has_phone": {"value": has_phone, "status": "✅" if has_phone else "⚠️"},
+        "has_privacy_link": {"value": has_privacy, "status": "✅" if has_privacy else "❌"},
         "has_robots_txt": {"value": robots_ok, "status": "✅" if robots_ok else "⚠️"}
     }
     
+# Bulky entries that add tokens to the prompt without helping the recommendations
+PROMPT_EXCLUDED_KEYS = {'full_report'}
+
+def summarize_for_prompt(data, max_items=10):
+    """Returns a copy of the audit data without bulky entries and with lists cut to max_items."""
+    if isinstance(data, dict):
+        return {key: summarize_for_prompt(value, max_items) for key, value in data.items() if key not in PROMPT_EXCLUDED_KEYS}
+    if isinstance(data, list):
+        return [summarize_for_prompt(item, max_items) for item in data[:max_items]]
+    return data
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client():
+    """Returns the shared OpenAI client, importing openai only when recommendations are requested."""
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
 def generate_recommendations(audit_data):
     """Sends a summarized version of the audit data to OpenAI for recommendations."""
     if not OPENAI_ENABLED:
@@ -168,16 +541,8 @@ def generate_recommendations(audit_data):
     
     st.write("🧠 Generating AI recommendations...")
 
-    # Create a deep copy and remove full_report to reduce payload size
-    data_for_prompt = copy.deepcopy(audit_data)
-
-    if data_for_prompt.get('performance'):
-        if data_for_prompt['performance'].get('desktop'):
-            data_for_prompt['performance']['desktop'].pop('full_report', None)
-        if data_for_prompt['performance'].get('mobile'):
-            data_for_prompt['performance']['mobile'].pop('full_report', None)
-    
-    prompt_data = json.dumps(data_for_prompt, indent=2)
+    # Compact JSON of the trimmed summary keeps the prompt (and response latency) small
+    prompt_data = orjson.dumps(summarize_for_prompt(audit_data)).decode()
 
     prompt = f"""
     You are an expert web developer and SEO specialist. Analyze the following website audit summary data.
@@ -191,7 +556,7 @@ def generate_recommendations(audit_data):
     """
     
     try:
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a web performance and SEO expert providing actionable advice."}, 
@@ -199,7 +564,7 @@ def generate_recommendations(audit_data):
             ],
             response_format={"type": "json_object"},
             temperature=0.6,
-            max_tokens=2000
+            max_tokens=1200
         )
         return json.loads(response.choices[0].message.content)
     except Exception as e:
@@ -209,49 +574,133 @@ def generate_recommendations(audit_data):
             st.error(f"Failed to get AI recommendations: {e}")
         return {"summary": "Error generating recommendations.", "actionItems": []}
 
+class PersistentBrowser:
+    """Keeps one headless Chromium running across audits; each URL gets a fresh context.
+
+    Playwright's sync API is bound to the thread that started it, but Streamlit runs
+    every script rerun on a new thread, so all of this browser's work goes through one
+    dedicated worker thread. BrowserPool runs several of these side by side.
+    """
+
+    LAUNCH_ARGS = [
+        '--no-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-gpu',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor',
+        '--no-first-run',
+        '--no-default-browser-check',
+        '--disable-extensions'
+    ]
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playwright")
+        self._playwright = None
+        self._browser = None
+
+    def _get_browser(self):
+        if self._browser is None or not self._browser.is_connected():
+            if self._playwright is None:
+                from playwright.sync_api import sync_playwright
+                self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=True, args=self.LAUNCH_ARGS)
+        return self._browser
+
+    def _fetch(self, url):
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+        context = self._get_browser().new_context(
+            viewport={'width': 1280, 'height': 720},
+            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        )
+        try:
+            page = context.new_page()
+            # Only the static HTML is audited here; Lighthouse does its own full page load,
+            # so there is no need to wait for the network to go idle.
+            page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            try:
+                page.wait_for_selector('body', timeout=5000)
+            except PlaywrightTimeoutError:
+                pass
+            return page.content()
+        finally:
+            context.close()
+
+    def _shutdown(self):
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    def fetch_page_content(self, url):
+        """Loads a URL in a new browser context and returns the rendered HTML."""
+        return self._executor.submit(self._fetch, url).result()
+
+    def close(self):
+        try:
+            self._executor.submit(self._shutdown).result(timeout=10)
+        except Exception:
+            pass
+        self._executor.shutdown(wait=False)
+
+class BrowserPool:
+    """A fixed set of PersistentBrowsers, so page fetches from concurrent audits run in parallel.
+
+    Each browser handles one fetch at a time; when all are busy, further fetches wait for
+    the next free one. Chromium is only launched in a browser the first time it is used.
+    """
+
+    def __init__(self, size):
+        self._browsers = [PersistentBrowser() for _ in range(size)]
+        self._idle = queue.Queue()
+        for browser in self._browsers:
+            self._idle.put(browser)
+
+    def fetch_page_content(self, url):
+        """Loads a URL on the next free browser and returns the rendered HTML."""
+        browser = self._idle.get()
+        try:
+            return browser.fetch_page_content(url)
+        finally:
+            self._idle.put(browser)
+
+    def close(self):
+        for browser in self._browsers:
+            browser.close()
+
+@st.cache_resource(show_spinner=False)
+def get_browser():
+    """Returns the process-wide browser pool; each Chromium launches lazily on first use."""
+    pool = BrowserPool(BROWSER_POOL_SIZE)
+    atexit.register(pool.close)
+    return pool
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def perform_full_audit(url):
     """Orchestrates the entire audit process."""
     with st.status("Performing full website audit...", expanded=True) as status:
         all_data = {"url": url}
+
+        # Fetch robots.txt in the background while the page loads
+        robots_executor = ThreadPoolExecutor(max_workers=1)
+        robots_future = robots_executor.submit(check_robots_txt, url)
+        robots_executor.shutdown(wait=False)
         
         status.update(label="Fetching page content with Playwright...")
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-web-security',
-                        '--disable-features=VizDisplayCompositor',
-                        '--no-first-run',
-                        '--no-default-browser-check',
-                        '--disable-extensions'
-                    ]
-                )
-                context = browser.new_context(
-                    viewport={'width': 1280, 'height': 720},
-                    user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                )
-                page = context.new_page()
-                page.goto(url, wait_until='networkidle', timeout=60000)
-                page_content = page.content()
-                context.close()
-                browser.close()
-            soup = BeautifulSoup(page_content, 'html.parser')
+            page_content = get_browser().fetch_page_content(url)
         except Exception as e:
             st.error(f"Failed to load the page with Playwright: {e}")
             st.error("This might be due to browser installation issues in the deployment environment.")
             # Fallback to requests for basic content
             try:
                 st.info("Attempting fallback method...")
-                response = requests.get(url, timeout=30, headers={
+                response = get_http_session().get(url, timeout=30, headers={
                     'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
                 })
-                page_content = response.text
-                soup = BeautifulSoup(page_content, 'html.parser')
+                # Decoded once here so the rest of the audit only ever sees str, as from Playwright
+                page_content = response.content.decode(response.apparent_encoding or 'utf-8', 'replace')
                 st.warning("Using simplified content fetching. Some dynamic content may be missing.")
             except Exception as fallback_error:
                 st.error(f"Fallback method also failed: {fallback_error}")
@@ -261,10 +710,10 @@ def perform_full_audit(url):
         all_data['performance'] = run_lighthouse_audits(url)
         
         status.update(label="Analyzing SEO...")
-        all_data['seo'] = analyze_seo(soup)
+        all_data['seo'] = analyze_seo(parse_html(page_content))
         
         status.update(label="Analyzing technical features...")
-        all_data['technical'] = analyze_technical(soup, url, page_content)
+        all_data['technical'] = analyze_technical(url, page_content, robots_future)
 
         status.update(label="Generating AI recommendations...")
         all_data['recommendations'] = generate_recommendations(all_data)
@@ -297,11 +746,14 @@ def display_performance_card(device_name, perf_data):
         st.write("No metrics data available.")
     
     with st.expander("View Full Lighthouse JSON Report"):
-        full_report = perf_data.get("full_report", {})
-        if full_report:
-            st.json(full_report)
-        else:
+        report_path = perf_data.get("full_report", {}).get("_path")
+        if not report_path:
             st.write("No full report available.")
+        elif st.button("Load full report", key=f"load_full_report_{device_name}"):
+            try:
+                st.json(orjson.loads(Path(report_path).read_bytes()))
+            except (OSError, orjson.JSONDecodeError):
+                st.write("The full report is no longer available. Re-run the audit to regenerate it.")
 
 # --- Streamlit Main UI ---
 st.title("🚀 AI Website Auditor Pro")
@@ -312,85 +764,91 @@ url_to_audit = st.text_input("Enter a website URL to audit", "https://www.stream
 if st.button("Analyze Website", type="primary"):
     if not url_to_audit.startswith("http"):
         st.error("Please enter a valid URL (e.g., https://www.example.com)")
+        st.session_state.pop("audit_results", None)
     else:
-        results = perform_full_audit(url_to_audit)
+        st.session_state["audit_results"] = perform_full_audit(url_to_audit)
+
+# Results are rendered from session state so widgets inside them (e.g. the full
+# report loader) survive the rerun they trigger without running the audit again.
+if "audit_results" in st.session_state:
+    results = st.session_state["audit_results"]
+    
+    if results:
+        recs = results.get('recommendations', {})
+        perf = results.get('performance', {})
+        seo = results.get('seo', {})
+        tech = results.get('technical', {})
         
-        if results:
-            recs = results.get('recommendations', {})
-            perf = results.get('performance', {})
-            seo = results.get('seo', {})
-            tech = results.get('technical', {})
-            
-            st.header("⭐ AI Analysis & Recommendations")
-            st.info(recs.get('summary', "No summary available."), icon="💡")
-            
-            st.subheader("Top Action Items")
-            action_items = recs.get('actionItems', [])
-            if action_items:
-                for i, item in enumerate(action_items):
-                    st.markdown(f"**{i+1}.** {item}")
-            else:
-                st.write("No action items available.")
-            st.divider()
-
-            tab1, tab2, tab3 = st.tabs(["📊 Performance Audit", "🔎 SEO Analysis", "⚙️ Technical Checklist"])
-
-            with tab1:
-                if perf and not perf.get("error"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        display_performance_card("Desktop", perf.get('desktop', {}))
-                    with col2:
-                        display_performance_card("Mobile", perf.get('mobile', {}))
-                else:
-                    st.error("Performance audit could not be completed.")
-                    if perf.get("error"):
-                        st.write(f"Error: {perf['error']}")
-
-            with tab2:
-                st.subheader("On-Page SEO Factors")
-                if seo:
-                    c1, c2 = st.columns(2)
-                    title_length = seo['title']['length']
-                    desc_length = seo['meta_description']['length']
-                    
-                    c1.metric("Title Tag Length", f"{title_length} characters", 
-                             "Good" if title_length <= 60 else "Too Long")
-                    c1.write(f"**Title:** {seo['title']['text']}")
-                    
-                    c2.metric("Meta Description Length", f"{desc_length} characters", 
-                             "Good" if desc_length <= 160 else "Too Long")
-                    c2.write(f"**Description:** {seo['meta_description']['text']}")
-                    
-                    st.divider()
-                    st.subheader("Content Structure")
-                    c3, c4 = st.columns(2)
-                    
-                    heading_df = pd.DataFrame.from_dict(seo['headings'], orient='index', columns=['Count'])
-                    c3.write("##### Heading Tag Distribution")
-                    c3.dataframe(heading_df)
-
-                    c4.write("##### Image SEO")
-                    missing_alt = seo['images']['missing_alt']
-                    total_images = seo['images']['total']
-                    coverage_percent = float(seo['images']['coverage_percent'])
-                    
-                    c4.metric("Images Missing Alt Text", f"{missing_alt} / {total_images}", 
-                             "Good" if missing_alt == 0 else "Needs Improvement")
-                    c4.progress(coverage_percent / 100, text=f"{coverage_percent:.1f}% Alt Text Coverage")
-
-            with tab3:
-                st.subheader("Technical & Setup Checklist")
-                if tech:
-                    tech_items = [
-                        {"Feature": "HTTPS Enabled", "Status": tech['https_enabled']['status'], "Details": "Site is served over a secure connection."},
-                        {"Feature": "Contact Page Link", "Status": tech['has_contact_page']['status'], "Details": "A link to a contact page was found."},
-                        {"Feature": "Email Address Found", "Status": tech['has_email']['status'], "Details": "An email address is present on the page."},
-                        {"Feature": "Phone Number Found", "Status": tech['has_phone']['status'], "Details": "A phone number is present on the page."},
-                        {"Feature": "Privacy Policy Link", "Status": tech['has_privacy_link']['status'], "Details": "A link to a privacy policy was found."},
-                        {"Feature": "Robots.txt Exists", "Status": tech['has_robots_txt']['status'], "Details": "The site has a robots.txt file."},
-                    ]
-                    df_tech = pd.DataFrame(tech_items)
-                    st.dataframe(df_tech, use_container_width=True)
+        st.header("⭐ AI Analysis & Recommendations")
+        st.info(recs.get('summary', "No summary available."), icon="💡")
+        
+        st.subheader("Top Action Items")
+        action_items = recs.get('actionItems', [])
+        if action_items:
+            for i, item in enumerate(action_items):
+                st.markdown(f"**{i+1}.** {item}")
         else:
-            st.error("Failed to complete the audit. Please check the URL and try again.")
\ No newline at end of file
+            st.write("No action items available.")
+        st.divider()
+
+        tab1, tab2, tab3 = st.tabs(["📊 Performance Audit", "🔎 SEO Analysis", "⚙️ Technical Checklist"])
+
+        with tab1:
+            if perf and not perf.get("error"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    display_performance_card("Desktop", perf.get('desktop', {}))
+                with col2:
+                    display_performance_card("Mobile", perf.get('mobile', {}))
+            else:
+                st.error("Performance audit could not be completed.")
+                if perf.get("error"):
+                    st.write(f"Error: {perf['error']}")
+
+        with tab2:
+            st.subheader("On-Page SEO Factors")
+            if seo:
+                c1, c2 = st.columns(2)
+                title_length = seo['title']['length']
+                desc_length = seo['meta_description']['length']
+                
+                c1.metric("Title Tag Length", f"{title_length} characters", 
+                         "Good" if title_length <= 60 else "Too Long")
+                c1.write(f"**Title:** {seo['title']['text']}")
+                
+                c2.metric("Meta Description Length", f"{desc_length} characters", 
+                         "Good" if desc_length <= 160 else "Too Long")
+                c2.write(f"**Description:** {seo['meta_description']['text']}")
+                
+                st.divider()
+                st.subheader("Content Structure")
+                c3, c4 = st.columns(2)
+                
+                heading_df = pd.DataFrame.from_dict(seo['headings'], orient='index', columns=['Count'])
+                c3.write("##### Heading Tag Distribution")
+                c3.dataframe(heading_df)
+
+                c4.write("##### Image SEO")
+                missing_alt = seo['images']['missing_alt']
+                total_images = seo['images']['total']
+                coverage_percent = float(seo['images']['coverage_percent'])
+                
+                c4.metric("Images Missing Alt Text", f"{missing_alt} / {total_images}", 
+                         "Good" if missing_alt == 0 else "Needs Improvement")
+                c4.progress(coverage_percent / 100, text=f"{coverage_percent:.1f}% Alt Text Coverage")
+
+        with tab3:
+            st.subheader("Technical & Setup Checklist")
+            if tech:
+                tech_items = [
+                    {"Feature": "HTTPS Enabled", "Status": tech['https_enabled']['status'], "Details": "Site is served over a secure connection."},
+                    {"Feature": "Contact Page Link", "Status": tech['has_contact_page']['status'], "Details": "A link to a contact page was found."},
+                    {"Feature": "Email Address Found", "Status": tech['has_email']['status'], "Details": "An email address is present on the page."},
+                    {"Feature": "Phone Number Found", "Status": tech['has_phone']['status'], "Details": "A phone number is present on the page."},
+                    {"Feature": "Privacy Policy Link", "Status": tech['has_privacy_link']['status'], "Details": "A link to a privacy policy was found."},
+                    {"Feature": "Robots.txt Exists", "Status": tech['has_robots_txt']['status'], "Details": "The site has a robots.txt file."},
+                ]
+                df_tech = pd.DataFrame(tech_items)
+                st.dataframe(df_tech, use_container_width=True)
+    else:
+        st.error("Failed to complete the audit. Please check the URL and try again.")
\ No newline at end of file
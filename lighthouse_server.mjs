@@ -0,0 +1,151 @@
+// Long-lived Lighthouse server: keeps Lighthouse loaded and a headless Chrome warm
+// between audits, so neither Node startup nor Chrome startup is paid per audit.
+//
+// Reads one JSON command per line on stdin:
+//   {"id": 1, "url": "https://...", "device": "desktop", "outputPath": "/tmp/....json",
+//    "queueTimeoutMs": 300000}
+// writes the JSON report to outputPath and answers on stdout, one line per message:
+//   {"id": 1, "started": true} when the run leaves the queue, then
+//   {"id": 1} on success, {"id": 1, "error": "..."} on failure.
+// A command still queued after queueTimeoutMs (optional) fails without running.
+//
+// Commands run one at a time, in order: Lighthouse keeps its logger, timing marks and
+// i18n state in module globals, so overlapping runs in one process would mix them up.
+// Parallel audits use separate server processes (the Python side starts one per
+// device). Between runs the Chrome is kept warm for the next command.
+import { unlink, writeFile } from 'node:fs/promises';
+import { createInterface } from 'node:readline';
+import * as chromeLauncher from 'chrome-launcher';
+import lighthouse from 'lighthouse';
+import desktopConfig from 'lighthouse/core/config/desktop-config.js';
+
+const CHROME_FLAGS = ['--headless', '--no-sandbox', '--disable-dev-shm-usage'];
+const FLAGS = {
+  output: 'json',
+  logLevel: 'error',
+  onlyCategories: ['performance', 'seo', 'accessibility', 'best-practices'],
+};
+const MAX_IDLE_CHROMES = 1;
+// Slightly below the Python client's 2-minute deadline (both counted from when the run
+// starts), so a hung run frees its Chrome.
+const RUN_TIMEOUT_MS = 110_000;
+
+const chromes = new Set();
+const idleChromes = [];
+// Tail of the run queue; each run starts once the previous one has settled.
+let lastRun = Promise.resolve();
+
+function inRunQueue(task) {
+  const run = lastRun.then(task);
+  lastRun = run.catch(() => {});
+  return run;
+}
+
+async function acquireChrome() {
+  while (idleChromes.length) {
+    const chrome = idleChromes.pop();
+    if (chrome.process.exitCode === null) {
+      return chrome;
+    }
+    chromes.delete(chrome);
+  }
+  const chrome = await chromeLauncher.launch({ chromeFlags: CHROME_FLAGS });
+  chromes.add(chrome);
+  return chrome;
+}
+
+function releaseChrome(chrome, healthy) {
+  if (healthy && idleChromes.length < MAX_IDLE_CHROMES) {
+    idleChromes.push(chrome);
+  } else {
+    chromes.delete(chrome);
+    chrome.kill();
+  }
+}
+
+function runAudit({ id, url, device, outputPath, queueTimeoutMs }) {
+  const queuedAt = Date.now();
+  return new Promise((resolve, reject) => {
+    // The queue only moves on once the run has really finished, even after its
+    // timeout has already answered the client, so runs never overlap.
+    inRunQueue(async () => {
+      if (queueTimeoutMs && Date.now() - queuedAt > queueTimeoutMs) {
+        reject(new Error(`Lighthouse run waited more than ${queueTimeoutMs / 1000}s in the queue`));
+        return;
+      }
+      respond({ id, started: true });
+      // The timeout starts now, so time spent queued behind other audits doesn't count,
+      // and fires before the Python client's deadline. After it fires the run must not
+      // leave a report behind.
+      const run = { timedOut: false, chrome: null };
+      const timer = setTimeout(() => {
+        run.timedOut = true;
+        run.chrome?.kill();
+        reject(new Error(`Lighthouse run timed out after ${RUN_TIMEOUT_MS / 1000}s`));
+      }, RUN_TIMEOUT_MS);
+      try {
+        await runLighthouse(run, url, device, outputPath);
+        resolve();
+      } catch (err) {
+        reject(err);
+      } finally {
+        clearTimeout(timer);
+      }
+    });
+  });
+}
+
+async function runLighthouse(run, url, device, outputPath) {
+  const chrome = await acquireChrome();
+  if (run.timedOut) {
+    // Timed out while Chrome was starting; the browser itself is fine.
+    releaseChrome(chrome, true);
+    return;
+  }
+  run.chrome = chrome;
+  let healthy = false;
+  try {
+    // The default Lighthouse config is mobile; desktop needs its preset.
+    const config = device === 'desktop' ? desktopConfig : undefined;
+    const result = await lighthouse(url, { ...FLAGS, port: chrome.port }, config);
+    healthy = !run.timedOut;
+    if (run.timedOut) {
+      return;
+    }
+    const runtimeError = result?.lhr?.runtimeError;
+    if (runtimeError) {
+      throw new Error(`${runtimeError.code}: ${runtimeError.message}`);
+    }
+    await writeFile(outputPath, result.report);
+    if (run.timedOut) {
+      await unlink(outputPath).catch(() => {});
+    }
+  } finally {
+    releaseChrome(chrome, healthy);
+  }
+}
+
+function respond(message) {
+  process.stdout.write(`${JSON.stringify(message)}\n`);
+}
+
+const input = createInterface({ input: process.stdin });
+
+input.on('line', (line) => {
+  let command;
+  try {
+    command = JSON.parse(line);
+  } catch {
+    return;
+  }
+  runAudit(command).then(
+    () => respond({ id: command.id }),
+    (err) => respond({ id: command.id, error: String(err?.message ?? err) }),
+  );
+});
+
+// The Python side closes stdin on shutdown.
+input.on('close', async () => {
+  await Promise.allSettled([...chromes].map((chrome) => chrome.kill()));
+  process.exit(0);
+});